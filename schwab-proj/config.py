@@ -6,13 +6,29 @@ order management and order export functionalities.
 """
 
 import os
+import sys
+import queue
+import atexit
 import logging
+import functools
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from dataclasses import dataclass
-from typing import List, Optional
-from dotenv import load_dotenv
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
 
 
-@dataclass
+@functools.lru_cache(maxsize=1)
+def _ensure_dotenv_loaded() -> bool:
+    """Load the .env file once per process; later loader calls reuse it"""
+    from dotenv import load_dotenv
+    load_dotenv()
+    return True
+
+
+# Slotted dataclasses (no per-instance __dict__) need Python 3.10+; 3.9 keeps plain ones
+_DATACLASS_OPTIONS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_DATACLASS_OPTIONS)
 class SchwabAPIConfig:
     """Base configuration for Schwab API access"""
     client_id: str
@@ -30,7 +46,17 @@ class SchwabAPIConfig:
             raise ValueError("CALLBACK_URL is required")
 
 
-@dataclass
+# TradingConfig period fields that must be positive, with their error-message labels
+_INDICATOR_PERIOD_FIELDS = (
+    ("sma_period", "SMA period"),
+    ("ema_period", "EMA period"),
+    ("breakeven_ema_period", "Breakeven EMA period"),
+    ("atr_period", "ATR period"),
+    ("chandelier_period", "Chandelier period"),
+)
+
+
+@dataclass(**_DATACLASS_OPTIONS)
 class TradingConfig(SchwabAPIConfig):
     """Configuration for trading operations"""
     # Trading parameters
@@ -62,29 +88,30 @@ class TradingConfig(SchwabAPIConfig):
     giveback_activation_pct: float = 0.20  # arm peak tracking once up this much
     peak_state_path: str = "peak_state.json"
     
+    # Concurrent price-history requests per run; kept small to respect Schwab rate limits
+    market_data_workers: int = 8
+    # Completed daily candles kept between runs so only new ones are downloaded ("" disables)
+    candle_cache_path: str = "candle_cache.json"
+    
     def __post_init__(self):
-        super().__post_init__()
+        # Explicit base call: zero-argument super() breaks on slotted dataclasses
+        SchwabAPIConfig.__post_init__(self)
         if self.tickers is None:
             self.tickers = []
         
         # Validate technical indicator periods
-        if self.sma_period <= 0:
-            raise ValueError("SMA period must be positive")
-        if self.ema_period <= 0:
-            raise ValueError("EMA period must be positive")
-        if self.breakeven_ema_period <= 0:
-            raise ValueError("Breakeven EMA period must be positive")
-        if self.atr_period <= 0:
-            raise ValueError("ATR period must be positive")
-        if self.chandelier_period <= 0:
-            raise ValueError("Chandelier period must be positive")
+        for field_name, label in _INDICATOR_PERIOD_FIELDS:
+            if getattr(self, field_name) <= 0:
+                raise ValueError(f"{label} must be positive")
         if not (0 < self.giveback_pct < 1):
             raise ValueError("giveback_pct must be between 0 and 1")
         if self.giveback_activation_pct <= 0:
             raise ValueError("giveback_activation_pct must be positive")
+        if self.market_data_workers <= 0:
+            raise ValueError("market_data_workers must be positive")
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class ExportConfig(SchwabAPIConfig):
     """Configuration for order export operations"""
     # File settings
@@ -101,7 +128,7 @@ class ExportConfig(SchwabAPIConfig):
     max_orders_per_file: int = 10000
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class LoggingConfig:
     """Configuration for logging settings"""
     level: str = "INFO"
@@ -112,130 +139,184 @@ class LoggingConfig:
     backup_count: int = 5
 
 
+# Background thread that drains queued log records into the real handlers
+_queue_listener: Optional[QueueListener] = None
+
+
+def _stop_queue_listener() -> None:
+    """Flush queued log records and stop the listener thread"""
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+
 def setup_logging(config: LoggingConfig, log_filename: str) -> logging.Logger:
-    """Set up logging with the given configuration"""
+    """Set up logging with the given configuration.
+    
+    The root logger only enqueues records; a QueueListener thread does the
+    console and file writes so callers never block on handler I/O.
+    """
+    global _queue_listener
     logger = logging.getLogger()
     logger.setLevel(getattr(logging, config.level.upper()))
     
-    # Clear existing handlers
+    # Clear existing handlers and any listener from a previous setup
     logger.handlers.clear()
+    _stop_queue_listener()
     
     formatter = logging.Formatter(config.format)
+    handlers: List[logging.Handler] = []
     
     if config.console_enabled:
         console_handler = logging.StreamHandler()
         console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
+        handlers.append(console_handler)
     
     if config.file_enabled:
-        from logging.handlers import RotatingFileHandler
         file_handler = RotatingFileHandler(
             log_filename,
             maxBytes=config.max_file_size,
-            backupCount=config.backup_count
+            backupCount=config.backup_count,
+            delay=True
         )
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
+    
+    if handlers:
+        log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+        _queue_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _queue_listener.start()
+        logger.addHandler(QueueHandler(log_queue))
     
     return logger
 
 
+# Registered after logging's own shutdown hook, so it runs first and flushes the queue
+atexit.register(_stop_queue_listener)
+
+
+def _env_flag(value: str) -> bool:
+    """Parse a "true"/"false" environment flag"""
+    return value.lower() == "true"
+
+
+# Environment variable -> (caster, default) for TradingConfig; the field name is the
+# lower-cased variable name. Credentials and TICKERS are handled separately.
+TRADING_ENV_SCHEMA: Dict[str, Tuple[Callable[[str], Any], str]] = {
+    "TOKEN_PATH": (str, "token.json"),
+    "DRY_RUN": (_env_flag, "false"),
+    "DEBUG": (_env_flag, "false"),
+    
+    # Technical indicators
+    "SMA_PERIOD": (int, "20"),
+    "EMA_PERIOD": (int, "10"),
+    "BREAKEVEN_EMA_PERIOD": (int, "5"),
+    "ATR_PERIOD": (int, "14"),
+    "CHANDELIER_PERIOD": (int, "22"),
+    "CHANDELIER_MULTIPLIER": (float, "3.0"),
+    
+    # Risk management
+    "MAX_POSITION_SIZE": (float, "10000.0"),
+    "MAX_DAILY_TRADES": (int, "10"),
+    "MIN_PRICE": (float, "1.0"),
+    
+    # Adaptive stop parameters
+    "PROFIT_THRESHOLD": (float, "0.05"),
+    "LOSS_THRESHOLD": (float, "-0.03"),
+    "MAX_LOSS_PERCENT": (float, "0.05"),
+    "BREAKEVEN_BUFFER": (float, "0.01"),
+    
+    "GIVEBACK_PCT": (float, "0.25"),
+    "GIVEBACK_ACTIVATION_PCT": (float, "0.20"),
+    "PEAK_STATE_PATH": (str, "peak_state.json"),
+    
+    "MARKET_DATA_WORKERS": (int, "8"),
+    "CANDLE_CACHE_PATH": (str, "candle_cache.json"),
+}
+
+
+def _load_env_fields(schema: Dict[str, Tuple[Callable[[str], Any], str]],
+                     env: Mapping[str, str]) -> Dict[str, Any]:
+    """Coerce each schema entry from env (or its default) into dataclass keyword arguments"""
+    return {name.lower(): caster(env.get(name, default)) for name, (caster, default) in schema.items()}
+
+
+@functools.lru_cache(maxsize=1)
 def load_trading_config() -> TradingConfig:
-    """Load trading configuration from environment variables"""
-    load_dotenv()
+    """Load trading configuration from environment variables (cached; use .cache_clear() to reload)"""
+    _ensure_dotenv_loaded()
+    env = os.environ
     
     # Parse tickers from comma-separated string
-    tickers_str = os.getenv("TICKERS")
+    tickers_str = env.get("TICKERS")
     tickers = [ticker.strip() for ticker in tickers_str.split(",") if ticker.strip()]
     
     return TradingConfig(
-        client_id=os.getenv("SCHWAB_CLIENT_ID"),
-        client_secret=os.getenv("SCHWAB_CLIENT_SECRET"),
-        callback_url=os.getenv("CALLBACK_URL"),
-        token_path=os.getenv("TOKEN_PATH", "token.json"),
+        client_id=env.get("SCHWAB_CLIENT_ID"),
+        client_secret=env.get("SCHWAB_CLIENT_SECRET"),
+        callback_url=env.get("CALLBACK_URL"),
         tickers=tickers,
-        dry_run=os.getenv("DRY_RUN", "false").lower() == "true",
-        debug=os.getenv("DEBUG", "false").lower() == "true",
-        
-        # Technical indicators
-        sma_period=int(os.getenv("SMA_PERIOD", "20")),
-        ema_period=int(os.getenv("EMA_PERIOD", "10")),
-        breakeven_ema_period=int(os.getenv("BREAKEVEN_EMA_PERIOD", "5")),
-        atr_period=int(os.getenv("ATR_PERIOD", "14")),
-        chandelier_period=int(os.getenv("CHANDELIER_PERIOD", "22")),
-        chandelier_multiplier=float(os.getenv("CHANDELIER_MULTIPLIER", "3.0")),
-        
-        # Risk management
-        max_position_size=float(os.getenv("MAX_POSITION_SIZE", "10000.0")),
-        max_daily_trades=int(os.getenv("MAX_DAILY_TRADES", "10")),
-        min_price=float(os.getenv("MIN_PRICE", "1.0")),
-        
-        # Adaptive stop parameters
-        profit_threshold=float(os.getenv("PROFIT_THRESHOLD", "0.05")),
-        loss_threshold=float(os.getenv("LOSS_THRESHOLD", "-0.03")),
-        max_loss_percent=float(os.getenv("MAX_LOSS_PERCENT", "0.05")),
-        breakeven_buffer=float(os.getenv("BREAKEVEN_BUFFER", "0.01")),
-        
-        giveback_pct=float(os.getenv("GIVEBACK_PCT", "0.25")),
-        giveback_activation_pct=float(os.getenv("GIVEBACK_ACTIVATION_PCT", "0.20")),
-        peak_state_path=os.getenv("PEAK_STATE_PATH", "peak_state.json"),
+        **_load_env_fields(TRADING_ENV_SCHEMA, env),
     )
 
 
+@functools.lru_cache(maxsize=1)
 def load_export_config() -> ExportConfig:
-    """Load export configuration from environment variables"""
-    load_dotenv()
+    """Load export configuration from environment variables (cached; use .cache_clear() to reload)"""
+    _ensure_dotenv_loaded()
+    env = os.environ
     
     return ExportConfig(
-        client_id=os.getenv("SCHWAB_CLIENT_ID"),
-        client_secret=os.getenv("SCHWAB_CLIENT_SECRET"),
-        callback_url=os.getenv("CALLBACK_URL"),
-        token_path=os.getenv("TOKEN_PATH", "token.json"),
+        client_id=env.get("SCHWAB_CLIENT_ID"),
+        client_secret=env.get("SCHWAB_CLIENT_SECRET"),
+        callback_url=env.get("CALLBACK_URL"),
+        token_path=env.get("TOKEN_PATH", "token.json"),
         
         # Export settings
-        output_file=os.getenv("OUTPUT_FILE", "filled_orders.csv"),
-        cutoff_date=os.getenv("CUTOFF_DATE", "2024-06-15T00:00:00+00:00"),
+        output_file=env.get("OUTPUT_FILE", "filled_orders.csv"),
+        cutoff_date=env.get("CUTOFF_DATE", "2024-06-15T00:00:00+00:00"),
         
         # Databricks settings
-        databricks_profile=os.getenv("DATABRICKS_PROFILE", "mypharos"),
-        databricks_remote_path=os.getenv("DATABRICKS_REMOTE_PATH", "/Volumes/workspace/default/landing/filled_orders.csv"),
-        databricks_job_id=int(os.getenv("DATABRICKS_JOB_ID", "939121727711316")),
+        databricks_profile=env.get("DATABRICKS_PROFILE", "mypharos"),
+        databricks_remote_path=env.get("DATABRICKS_REMOTE_PATH", "/Volumes/workspace/default/landing/filled_orders.csv"),
+        databricks_job_id=int(env.get("DATABRICKS_JOB_ID", "939121727711316")),
         
         # Export options
-        include_cancelled=os.getenv("INCLUDE_CANCELLED", "false").lower() == "true",
-        max_orders_per_file=int(os.getenv("MAX_ORDERS_PER_FILE", "10000"))
+        include_cancelled=env.get("INCLUDE_CANCELLED", "false").lower() == "true",
+        max_orders_per_file=int(env.get("MAX_ORDERS_PER_FILE", "10000"))
     )
 
 
+@functools.lru_cache(maxsize=1)
 def load_logging_config() -> LoggingConfig:
-    """Load logging configuration from environment variables"""
-    load_dotenv()
+    """Load logging configuration from environment variables (cached; use .cache_clear() to reload)"""
+    _ensure_dotenv_loaded()
+    env = os.environ
     
     return LoggingConfig(
-        level=os.getenv("LOG_LEVEL", "INFO"),
-        format=os.getenv("LOG_FORMAT", "%(asctime)s - %(levelname)s - %(name)s - %(message)s"),
-        file_enabled=os.getenv("LOG_FILE_ENABLED", "true").lower() == "true",
-        console_enabled=os.getenv("LOG_CONSOLE_ENABLED", "true").lower() == "true",
-        max_file_size=int(os.getenv("LOG_MAX_FILE_SIZE", str(10 * 1024 * 1024))),
-        backup_count=int(os.getenv("LOG_BACKUP_COUNT", "5"))
+        level=env.get("LOG_LEVEL", "INFO"),
+        format=env.get("LOG_FORMAT", "%(asctime)s - %(levelname)s - %(name)s - %(message)s"),
+        file_enabled=env.get("LOG_FILE_ENABLED", "true").lower() == "true",
+        console_enabled=env.get("LOG_CONSOLE_ENABLED", "true").lower() == "true",
+        max_file_size=int(env.get("LOG_MAX_FILE_SIZE", str(10 * 1024 * 1024))),
+        backup_count=int(env.get("LOG_BACKUP_COUNT", "5"))
     )
 
 
 # Environment validation
 def validate_environment() -> bool:
     """Validate that all required environment variables are set"""
-    load_dotenv()
+    _ensure_dotenv_loaded()
+    env = os.environ
     
-    required_vars = [
+    required_vars = (
         "SCHWAB_CLIENT_ID",
         "SCHWAB_CLIENT_SECRET", 
         "CALLBACK_URL"
-    ]
+    )
     
-    missing_vars = []
-    for var in required_vars:
-        if not os.getenv(var):
-            missing_vars.append(var)
+    missing_vars = [var for var in required_vars if not env.get(var)]
     
     if missing_vars:
         print(f"Missing required environment variables: {', '.join(missing_vars)}")
@@ -0,0 +1,20 @@
+"""
+JSON helpers shared by the Schwab API scripts.
+
+Schwab responses are decoded with orjson when it is installed and with the
+stdlib parser (via the response's own .json()) otherwise.
+"""
+
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # optional: faster JSON decoding of Schwab responses
+    orjson = None
+
+
+def decode_json(resp) -> Any:
+    """Decode a JSON response body, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(resp.content)
+    return resp.json()
@@ -1,30 +1,52 @@
 import csv
+import itertools
 import logging
+import os
+import tempfile
+import threading
 from pathlib import Path
-from typing import List, Dict, Optional
-from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Callable, List, Dict, Iterable, Iterator, Optional
+from datetime import datetime, timedelta, timezone
 import json
 
-from schwab.auth import easy_client
-from databricks.sdk import WorkspaceClient
+# schwab-py and databricks-sdk pull in large dependency graphs; they are imported
+# where first used so module import stays cheap
+if TYPE_CHECKING:
+    from databricks.sdk import WorkspaceClient
 
+from json_utils import decode_json
 from config import load_export_config, setup_logging, load_logging_config, validate_environment
 
 # Initialize logging
 logging_config = load_logging_config()
 logger = setup_logging(logging_config, 'order_export.log')
 
+# CSV output is accumulated in memory and handed to the file in large chunks
+CSV_BUFFER_SIZE = 1 << 20  # 1 MiB
+CSV_FLUSH_ROWS = 10000
+
+# Read buffer for streaming the export file to Databricks
+UPLOAD_BUFFER_SIZE = 1 << 20  # 1 MiB
+
+# Order statuses written to the export
+EXPORTED_ORDER_STATUSES = frozenset({"FILLED"})
+
+# Orders responses that suggest a cached account hash is no longer valid
+STALE_ACCOUNT_HASH_STATUSES = frozenset({401, 403})
+
 class DatabricksManager:
     """Manages Databricks operations"""
     
     def __init__(self, config):
         self.config = config
         self._client = None
+        self._warm_up_thread: Optional[threading.Thread] = None
     
     @property
-    def client(self) -> WorkspaceClient:
+    def client(self) -> "WorkspaceClient":
         """Lazy initialization of Databricks client"""
         if self._client is None:
+            from databricks.sdk import WorkspaceClient
             try:
                 self._client = WorkspaceClient(profile=self.config.databricks_profile)
             except Exception as e:
@@ -32,6 +54,33 @@ class DatabricksManager:
                 raise
         return self._client
     
+    def start_warm_up(self) -> None:
+        """Build and authenticate the Databricks client in a background thread.
+        
+        Runs while the export is still being written so upload_file does not pay
+        for SDK import, profile resolution and token fetch. The thread is a daemon,
+        so a run that fails before uploading never waits on it.
+        """
+        if self._client is not None or self._warm_up_thread is not None:
+            return
+        self._warm_up_thread = threading.Thread(
+            target=self._warm_up, name="databricks-warm-up", daemon=True
+        )
+        self._warm_up_thread.start()
+    
+    def _warm_up(self) -> None:
+        try:
+            self.client.config.authenticate()
+        except Exception as e:
+            # Not fatal: upload_file builds the client again and reports the failure
+            logger.warning(f"Databricks client warm-up failed: {e}")
+    
+    def wait_for_warm_up(self) -> None:
+        """Block until a warm-up started by start_warm_up has finished"""
+        if self._warm_up_thread is not None:
+            self._warm_up_thread.join()
+            self._warm_up_thread = None
+    
     def upload_file(self, local_file_path: str, remote_path: str) -> bool:
         """Upload file to Databricks with error handling"""
         try:
@@ -39,7 +88,7 @@ class DatabricksManager:
                 logger.error(f"Local file not found: {local_file_path}")
                 return False
             
-            with open(local_file_path, "rb") as input_stream:
+            with open(local_file_path, "rb", buffering=UPLOAD_BUFFER_SIZE) as input_stream:
                 self.client.files.upload(remote_path, input_stream, overwrite=True)
             
             logger.info(f"Successfully uploaded {local_file_path} to {remote_path}")
@@ -65,12 +114,15 @@ class OrderExporter:
     
     def __init__(self, config):
         self.config = config
+        self.execution_state_file = "last_execution.json"
         self.client = self._initialize_client()
+        self._account_hash_from_cache = False
         self.account_hash = self._get_account_hash()
-        self.execution_state_file = "last_execution.json"
+        self.rows_written = 0  # execution legs written by the last export_orders() call
     
     def _initialize_client(self):
         """Initialize Schwab client with error handling"""
+        from schwab.auth import easy_client
         try:
             return easy_client(
                 api_key=self.config.client_id,
@@ -84,49 +136,78 @@ class OrderExporter:
             raise
     
     def _get_account_hash(self) -> str:
-        """Get account hash with error handling"""
+        """Get account hash, preferring the copy cached in the state file"""
+        cached = self._load_state().get('account_hash')
+        if isinstance(cached, str) and cached.isalnum():
+            logger.debug("Using cached account hash")
+            self._account_hash_from_cache = True
+            return cached
+        return self._fetch_account_hash()
+    
+    def _fetch_account_hash(self) -> str:
+        """Fetch account hash from the Schwab API with error handling"""
         try:
-            accounts = self.client.get_account_numbers().json()
+            accounts = decode_json(self.client.get_account_numbers())
             if not accounts:
                 raise ValueError("No accounts found")
+            self._account_hash_from_cache = False
             return accounts[0]["hashValue"]
         except Exception as e:
             logger.error(f"Failed to get account hash: {e}")
             raise
     
-    def _load_last_execution_date(self) -> Optional[datetime]:
-        """Load the last execution date from state file"""
+    def _load_state(self) -> Dict[str, Any]:
+        """Load the export state file (empty when missing or unreadable)"""
         try:
             if Path(self.execution_state_file).exists():
                 with open(self.execution_state_file, 'r') as f:
                     state = json.load(f)
-                    last_date = state.get('last_execution_date')
-                    if last_date:
-                        return datetime.fromisoformat(last_date)
+                if isinstance(state, dict):
+                    return state
+        except Exception as e:
+            logger.warning(f"Failed to load export state: {e}")
+        return {}
+    
+    def _load_last_execution_date(self) -> Optional[datetime]:
+        """Load the last execution date from state file"""
+        try:
+            last_date = self._load_state().get('last_execution_date')
+            if last_date:
+                return datetime.fromisoformat(last_date)
         except Exception as e:
             logger.warning(f"Failed to load last execution date: {e}")
         return None
     
     def _save_execution_date(self, execution_date: datetime) -> bool:
-        """Save the current execution date to state file"""
+        """Save the current execution date to state file (atomically, via temp file + rename)"""
+        tmp_path = None
         try:
-            from datetime import timezone
+            execution_date_str = execution_date.isoformat()
             state = {
-                'last_execution_date': execution_date.isoformat(),
-                'last_updated': datetime.now(timezone.utc).isoformat()
+                'last_execution_date': execution_date_str,
+                'last_updated': datetime.now(timezone.utc).isoformat(),
+                'account_hash': self.account_hash
             }
-            with open(self.execution_state_file, 'w') as f:
-                json.dump(state, f, indent=2)
-            logger.info(f"Saved execution date: {execution_date.isoformat()}")
+            path = Path(self.execution_state_file)
+            fd, tmp_path = tempfile.mkstemp(
+                dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp"
+            )
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(state, f, separators=(',', ':'))
+            os.replace(tmp_path, path)
+            logger.info(f"Saved execution date: {execution_date_str}")
             return True
         except Exception as e:
             logger.error(f"Failed to save execution date: {e}")
+            if tmp_path is not None:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
             return False
     
     def _get_date_range(self) -> tuple[datetime, datetime]:
         """Get the date range for order extraction"""
-        from datetime import timezone
-        
         # Current execution time with timezone awareness
         to_date = datetime.now(timezone.utc)
         
@@ -152,25 +233,41 @@ class OrderExporter:
         
         return from_date, to_date
     
-    def get_all_orders(self) -> List[Dict]:
-        """Fetch orders from account using incremental date range"""
+    def _request_orders(self, from_date: datetime, to_date: datetime):
+        """Request account orders entered within the given window"""
+        return self.client.get_orders_for_account(
+            self.account_hash,
+            from_entered_datetime=from_date,
+            to_entered_datetime=to_date
+        )
+    
+    def get_all_orders(self, from_date: Optional[datetime] = None,
+                       to_date: Optional[datetime] = None) -> Optional[List[Dict]]:
+        """Fetch orders from account using incremental date range (None if the fetch failed)"""
         try:
-            # Get date range for this execution
-            from_date, to_date = self._get_date_range()
+            # Resolve the date range only when the caller has not already done so
+            if from_date is None or to_date is None:
+                from_date, to_date = self._get_date_range()
             
             # API call with date range
-            resp = self.client.get_orders_for_account(
-                self.account_hash,
-                from_entered_datetime=from_date,
-                to_entered_datetime=to_date
+            resp = self._request_orders(from_date, to_date)
+            if resp.status_code in STALE_ACCOUNT_HASH_STATUSES and self._account_hash_from_cache:
+                # The cached hash may have been rotated; refetch it once and retry
+                logger.warning(f"Orders request returned HTTP {resp.status_code} with cached account hash; refetching it")
+                self.account_hash = self._fetch_account_hash()
+                resp = self._request_orders(from_date, to_date)
+            # httpx sends Accept-Encoding: gzip, deflate and decompresses transparently;
+            # log what the server actually negotiated
+            logger.debug(
+                f"Orders API response status: {resp.status_code}, "
+                f"content-encoding: {resp.headers.get('content-encoding', 'identity')}"
             )
-            logger.debug(f"Orders API response status: {resp.status_code}")
             
             if resp.status_code != 200:
                 logger.error(f"Failed to fetch orders: HTTP {resp.status_code}")
-                return []
+                return None
             
-            raw = resp.json()
+            raw = decode_json(resp)
             orders_list = raw if isinstance(raw, list) else raw.get("data", raw.get("orders", []))
             
             logger.info(f"Retrieved {len(orders_list)} total orders")
@@ -178,113 +275,131 @@ class OrderExporter:
             
         except Exception as e:
             logger.error(f"Failed to get orders: {e}")
-            return []
+            return None
     
-    def filter_filled_orders(self, orders: List[Dict]) -> List[Dict]:
-        """Filter orders for filled status only - date filtering already handled by API"""
-        try:
-            filled_orders = []
-            total_orders = len(orders)
-            status_counts = {}
+    def filter_filled_orders(self, orders: Iterable[Dict]) -> Iterator[Dict]:
+        """Yield filled orders only - date filtering already handled by API"""
+        total_orders = 0
+        filled_count = 0
+        status_counts = {}
+        
+        # Bind lookups used on every order to locals for the tight loop below
+        exported_statuses = EXPORTED_ORDER_STATUSES
+        status_count = status_counts.get
+        
+        for order in orders:
+            total_orders += 1
+            get = order.get
+            status = get("status", "UNKNOWN")
+            status_counts[status] = status_count(status, 0) + 1
             
-            for order in orders:
-                status = order.get("status", "UNKNOWN")
-                status_counts[status] = status_counts.get(status, 0) + 1
-                
-                if status != "FILLED":
-                    continue
-                
-                # Validate that the order has an enteredTime (for logging purposes)
-                entered_time_str = order.get("enteredTime", "")
-                if not entered_time_str:
-                    logger.warning(f"Order {order.get('orderId')} missing enteredTime")
-                    continue
-                
-                filled_orders.append(order)
+            if status not in exported_statuses:
+                continue
             
-            # Log status breakdown for debugging
-            status_summary = ", ".join([f"{status}: {count}" for status, count in status_counts.items()])
-            logger.info(f"Order status breakdown from {total_orders} total orders: {status_summary}")
-            logger.info(f"Found {len(filled_orders)} filled orders")
-            return filled_orders
+            # Validate that the order has an enteredTime (for logging purposes)
+            if not get("enteredTime"):
+                logger.warning("Order %s missing enteredTime", get("orderId"))
+                continue
             
-        except Exception as e:
-            logger.error(f"Failed to filter orders: {e}")
-            return []
+            filled_count += 1
+            yield order
+        
+        # Log status breakdown for debugging once the stream is exhausted
+        status_summary = ", ".join([f"{status}: {count}" for status, count in status_counts.items()])
+        logger.info(f"Order status breakdown from {total_orders} total orders: {status_summary}")
+        logger.info(f"Found {filled_count} filled orders")
     
-    def write_orders_to_csv(self, orders: List[Dict]) -> bool:
-        """Write orders to CSV file"""
+    def write_orders_to_csv(self, orders: Iterable[Dict]) -> bool:
+        """Write orders to CSV file, batching rows into large buffered writes"""
+        output_file = self.config.output_file
         try:
-            with open(self.config.output_file, "w", newline="") as f:
+            with open(output_file, "w", newline="", encoding="utf-8", buffering=CSV_BUFFER_SIZE) as f:
                 writer = csv.writer(f)
                 writer.writerow(["orderId", "symbol", "instruction", "quantity", "price", "time"])
                 
+                rows = []
                 total_rows = 0
                 for order in orders:
+                    order_id = order.get("orderId")
                     try:
                         # Extract order leg information
                         order_legs = order.get("orderLegCollection", [])
                         if not order_legs:
-                            logger.warning(f"Order {order.get('orderId')} has no order legs")
+                            logger.warning("Order %s has no order legs", order_id)
                             continue
                         
                         leg_info = order_legs[0]
-                        symbol = leg_info.get("instrument", {}).get("symbol", "UNKNOWN")
+                        symbol = (leg_info.get("instrument") or {}).get("symbol", "UNKNOWN")
                         instruction = leg_info.get("instruction", "UNKNOWN")
                         
-                        # Write execution legs
-                        for activity in order.get("orderActivityCollection", []):
-                            if activity.get("activityType") == "EXECUTION":
-                                for leg in activity.get("executionLegs", []):
-                                    writer.writerow([
-                                        order.get("orderId"),
-                                        symbol,
-                                        instruction,
-                                        leg.get("quantity"),
-                                        leg.get("price"),
-                                        leg.get("time")
-                                    ])
-                                    total_rows += 1
+                        # Build all execution-leg rows for this order in one pass
+                        order_rows = [
+                            (order_id, symbol, instruction,
+                             leg.get("quantity"), leg.get("price"), leg.get("time"))
+                            for activity in order.get("orderActivityCollection", ())
+                            if activity.get("activityType") == "EXECUTION"
+                            for leg in activity.get("executionLegs", ())
+                        ]
+                        rows.extend(order_rows)
+                        total_rows += len(order_rows)
                     
                     except Exception as e:
-                        logger.error(f"Failed to process order {order.get('orderId')}: {e}")
+                        logger.error("Failed to process order %s: %s", order_id, e)
                         continue
+                    
+                    if len(rows) >= CSV_FLUSH_ROWS:
+                        writer.writerows(rows)
+                        rows.clear()
                 
-                logger.info(f"Wrote {total_rows} execution legs to {self.config.output_file}")
+                writer.writerows(rows)
+                self.rows_written = total_rows
+                logger.info(f"Wrote {total_rows} execution legs to {output_file}")
                 return True
                 
         except Exception as e:
             logger.error(f"Failed to write CSV file: {e}")
             return False
     
-    def export_orders(self) -> bool:
-        """Main export process"""
+    def export_orders(self, on_orders_found: Optional[Callable[[], None]] = None) -> bool:
+        """Main export process
+        
+        on_orders_found, if given, is called once the first filled order is seen,
+        before the CSV is written.
+        """
         logger.info("Starting order export process")
+        self.rows_written = 0
         
         # Get date range for this execution
         from_date, to_date = self._get_date_range()
         
-        # Get all orders
-        all_orders = self.get_all_orders()
+        # Get all orders for the window resolved above
+        all_orders = self.get_all_orders(from_date, to_date)
+        if all_orders is None:
+            # Fetch or auth failure: keep the saved execution date so the next run
+            # re-requests this window instead of skipping it
+            return False
         if not all_orders:
             logger.warning("No orders retrieved for the specified date range")
             # Save execution end time to ensure no gaps in next run
-            from datetime import timezone
             self._save_execution_date(datetime.now(timezone.utc))
             return True
         
-        # Filter for filled orders (date filtering already handled by API)
+        # Filter for filled orders (date filtering already handled by API).
+        # Orders stream straight into the CSV writer; peek one to detect an empty result.
         filled_orders = self.filter_filled_orders(all_orders)
-        if not filled_orders:
+        first_filled = next(filled_orders, None)
+        if first_filled is None:
             logger.warning("No filled orders found matching criteria")
             # Save execution end time to ensure no gaps in next run  
-            from datetime import timezone
             self._save_execution_date(datetime.now(timezone.utc))
             return True
         
+        if on_orders_found is not None:
+            on_orders_found()
+        
         # Write to CSV only - execution date is saved by OrderExportManager
         # after the full pipeline (upload + job trigger) succeeds
-        return self.write_orders_to_csv(filled_orders)
+        return self.write_orders_to_csv(itertools.chain((first_filled,), filled_orders))
 
 class OrderExportManager:
     """Main manager for the complete export and upload process"""
@@ -294,21 +409,6 @@ class OrderExportManager:
         self.exporter = OrderExporter(config)
         self.databricks = DatabricksManager(config)
     
-    def _has_orders_to_upload(self) -> bool:
-        """Check if CSV file exists and has order data (more than just header)"""
-        try:
-            if not Path(self.config.output_file).exists():
-                return False
-            
-            with open(self.config.output_file, 'r') as f:
-                lines = f.readlines()
-                # File should have header + at least one data row
-                return len(lines) > 1
-                
-        except Exception as e:
-            logger.warning(f"Failed to check CSV file content: {e}")
-            return False
-    
     def _delete_uploaded_file(self) -> bool:
         """Delete the CSV file after successful upload to prevent duplicate uploads"""
         try:
@@ -327,18 +427,20 @@ class OrderExportManager:
         logger.info("Starting order export and upload process")
         
         try:
-            # Export orders to CSV
-            if not self.exporter.export_orders():
+            # Export orders to CSV; the Databricks client warms up alongside the
+            # CSV write once there is at least one filled order to upload
+            if not self.exporter.export_orders(on_orders_found=self.databricks.start_warm_up):
                 logger.error("Failed to export orders")
                 return False
             
-            # Check if we have orders to upload
-            if not self._has_orders_to_upload():
+            # Check if the export wrote any rows to upload
+            if self.exporter.rows_written <= 0:
                 logger.info("No orders found in export - skipping Databricks upload and job trigger")
                 logger.info("Export process completed successfully (no new data)")
                 return True
             
             logger.info(f"Orders found in {self.config.output_file} - proceeding with Databricks operations")
+            self.databricks.wait_for_warm_up()
             
             # Upload to Databricks
             if not self.databricks.upload_file(
@@ -359,7 +461,6 @@ class OrderExportManager:
             # Save execution date only now that the full pipeline has succeeded.
             # If upload or job trigger failed, we intentionally skip this so the
             # next run re-fetches the same window and retries the upload.
-            from datetime import timezone
             self.exporter._save_execution_date(datetime.now(timezone.utc))
             
             logger.info("Order export and upload completed successfully")
@@ -2,16 +2,20 @@ from schwab.auth import easy_client
 from schwab.client import Client
 from schwab.orders.common import OrderType, Duration
 from schwab.orders.equities import equity_sell_limit
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
+import functools
 import json
 import logging
+import operator
 import os
 import tempfile
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple, Any
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
+from json_utils import decode_json
 from config import load_trading_config, setup_logging, load_logging_config, validate_environment
 
 # Initialize logging
@@ -25,11 +29,26 @@ class MarketData:
     highs: List[float]
     lows: List[float]
     closes: List[float]
+    # Trailing true ranges (oldest first), filled lazily by average_true_range and shared across periods
+    true_ranges: List[float] = field(default_factory=list, init=False, repr=False, compare=False)
     
     def __post_init__(self):
         if not (len(self.highs) == len(self.lows) == len(self.closes)):
             raise ValueError("All price lists must have the same length")
 
+@functools.lru_cache(maxsize=None)
+def _ema_weights(period: int) -> Tuple[float, ...]:
+    """Weights w such that EMA over a window = sum(w[i] * window[i]), oldest first.
+    
+    The seed (oldest) price keeps (1 - alpha)^(period - 1); each later price k gets
+    alpha * (1 - alpha)^(period - 1 - k).
+    """
+    alpha = 2 / (period + 1)
+    decay = 1 - alpha
+    return (decay ** (period - 1),) + tuple(
+        alpha * decay ** (period - 1 - k) for k in range(1, period)
+    )
+
 class TechnicalIndicators:
     """Calculate technical indicators for trading signals"""
     
@@ -46,13 +65,9 @@ class TechnicalIndicators:
         if len(prices) < period:
             raise ValueError(f"Not enough data points. Need {period}, got {len(prices)}")
         
-        alpha = 2 / (period + 1)
-        ema = prices[-period]  # seed with first value of window
-        
-        for price in prices[-period+1:]:
-            ema = alpha * price + (1 - alpha) * ema
-        
-        return ema
+        # Equivalent to seeding with the first value of the window and applying the
+        # recursive update across it, collapsed into one weighted sum
+        return sum(map(operator.mul, _ema_weights(period), prices[-period:]))
     
     @staticmethod
     def average_true_range(market_data: MarketData, period: int) -> float:
@@ -60,16 +75,17 @@ class TechnicalIndicators:
         if len(market_data.closes) < period + 1:  # +1 because we need previous close
             raise ValueError(f"Not enough data points. Need {period + 1}, got {len(market_data.closes)}")
         
-        true_ranges = []
-        for i in range(1, len(market_data.closes)):
-            tr = max(
-                market_data.highs[i] - market_data.lows[i],
-                abs(market_data.highs[i] - market_data.closes[i-1]),
-                abs(market_data.lows[i] - market_data.closes[i-1])
-            )
-            true_ranges.append(tr)
-        
-        return sum(true_ranges[-period:]) / period
+        # Only the trailing `period` true ranges are averaged, so only those are computed;
+        # they are kept on market_data so a shorter (or equal) period later just slices them
+        if len(market_data.true_ranges) < period:
+            start = len(market_data.closes) - period
+            market_data.true_ranges = [
+                max(high - low, abs(high - prev_close), abs(low - prev_close))
+                for high, low, prev_close in zip(market_data.highs[start:],
+                                                 market_data.lows[start:],
+                                                 market_data.closes[start - 1:-1])
+            ]
+        return sum(market_data.true_ranges[-period:]) / period
     
     @staticmethod
     def chandelier_exit(market_data: MarketData, period: int, multiplier: float) -> float:
@@ -83,6 +99,10 @@ class TechnicalIndicators:
         return highest_high - multiplier * atr
 
 
+# Candle fields kept in the on-disk candle cache (everything MarketData and the overlap check use)
+CANDLE_CACHE_FIELDS = ('datetime', 'high', 'low', 'close')
+
+
 def _avg_cost_epsilon(avg_cost: float) -> float:
     return max(1e-6, abs(avg_cost) * 1e-9)
 
@@ -95,6 +115,11 @@ class TradingManager:
         self.client = self._initialize_client()
         self.account_hash = self._get_account_hash()
         self._peak_state: Dict[str, Dict[str, Any]] = {}
+        self._candle_cache: Dict[str, List[Dict[str, float]]] = {}
+        # Fewest daily candles the indicators need; fixed for the life of the config
+        self._min_candles = max(config.sma_period, config.ema_period,
+                                config.breakeven_ema_period,
+                                config.atr_period + 1, config.chandelier_period)
     
     def _resolved_peak_state_path(self) -> Path:
         p = Path(self.config.peak_state_path)
@@ -141,6 +166,56 @@ class TradingManager:
             except OSError:
                 pass
     
+    def _resolved_candle_cache_path(self) -> Optional[Path]:
+        if not self.config.candle_cache_path:
+            return None
+        p = Path(self.config.candle_cache_path)
+        if not p.is_absolute():
+            p = Path.cwd() / p
+        return p
+    
+    def _load_candle_cache(self) -> Dict[str, List[Dict[str, float]]]:
+        path = self._resolved_candle_cache_path()
+        if path is None or not path.exists():
+            return {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                raw = json.load(f)
+            if not isinstance(raw, dict):
+                return {}
+            # Stored compactly as [datetime_ms, high, low, close] rows per symbol
+            return {
+                sym: [dict(zip(CANDLE_CACHE_FIELDS, row)) for row in rows]
+                for sym, rows in raw.items()
+                if isinstance(rows, list) and all(
+                    isinstance(row, list) and len(row) == len(CANDLE_CACHE_FIELDS) for row in rows
+                )
+            }
+        except (json.JSONDecodeError, OSError, TypeError, ValueError) as e:
+            logger.warning(f"Could not load candle cache from {path}: {e}")
+            return {}
+    
+    def _save_candle_cache(self, cache: Dict[str, List[Dict[str, float]]]) -> None:
+        path = self._resolved_candle_cache_path()
+        if path is None:
+            return
+        rows = {sym: [[c[k] for k in CANDLE_CACHE_FIELDS] for c in candles]
+                for sym, candles in cache.items()}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(
+            dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(rows, f, separators=(",", ":"))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"Failed to save candle cache to {path}: {e}")
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+    
     @staticmethod
     def _held_equity_symbols(positions: List[Dict]) -> set:
         held = set()
@@ -203,7 +278,7 @@ class TradingManager:
     def _get_account_hash(self) -> str:
         """Get account hash with error handling"""
         try:
-            accounts = self.client.get_account_numbers().json()
+            accounts = decode_json(self.client.get_account_numbers())
             if not accounts:
                 raise ValueError("No accounts found")
             return accounts[0]['hashValue']
@@ -214,10 +289,10 @@ class TradingManager:
     def get_positions(self) -> List[Dict]:
         """Get current positions"""
         try:
-            resp = self.client.get_account(
+            resp = decode_json(self.client.get_account(
                 self.account_hash,
                 fields=[Client.Account.Fields.POSITIONS]
-            ).json()
+            ))
             return resp.get("securitiesAccount", {}).get("positions", [])
         except Exception as e:
             logger.error(f"Failed to get positions: {e}")
@@ -226,64 +301,127 @@ class TradingManager:
     def get_open_orders(self) -> List[Dict]:
         """Get open orders with normalization"""
         try:
-            raw_orders = self.client.get_orders_for_account(self.account_hash).json()
+            raw_orders = decode_json(self.client.get_orders_for_account(self.account_hash))
             orders_list = raw_orders if isinstance(raw_orders, list) else raw_orders.get("data", raw_orders)
             
-            if self.config.debug:
-                logger.debug(f"Raw orders count: {len(orders_list)}")
+            if self.config.debug and logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Raw orders count: %d", len(orders_list))
                 for o in orders_list:
-                    logger.debug(f"Order {o.get('orderId')} status={o.get('status')} remaining={o.get('remainingQuantity')}")
+                    logger.debug("Order %s status=%s remaining=%s",
+                                 o.get('orderId'), o.get('status'), o.get('remainingQuantity'))
             
             open_orders = [o for o in orders_list if o.get("remainingQuantity", 0) > 0]
             
             if self.config.debug:
-                logger.debug(f"Open orders count: {len(open_orders)}")
+                logger.debug("Open orders count: %d", len(open_orders))
             
             return open_orders
         except Exception as e:
             logger.error(f"Failed to get open orders: {e}")
             return []
     
-    def get_market_data(self, symbol: str) -> Optional[MarketData]:
-        """Get historical market data for a symbol"""
+    def _request_daily_candles(self, symbol: str, start: datetime) -> List[Dict]:
+        hist = decode_json(self.client.get_price_history_every_day(symbol, start_datetime=start))
+        return hist.get('candles', [])
+    
+    def _get_daily_candles(self, symbol: str, start: datetime) -> List[Dict]:
+        """Daily candles since start, downloading only those newer than the cached ones"""
+        start_ms = int(start.timestamp() * 1000)
+        cached = [c for c in self._candle_cache.get(symbol, ()) if c['datetime'] >= start_ms]
+        candles = None
+        
+        if cached:
+            # Re-request from a day before the newest cached candle so it comes back as overlap;
+            # a changed overlap (e.g. split-adjusted history) invalidates the whole cached window
+            last = cached[-1]
+            since = datetime.fromtimestamp(last['datetime'] / 1000, tz=timezone.utc) - timedelta(days=1)
+            fresh = self._request_daily_candles(symbol, since)
+            overlap = next((i for i, c in enumerate(fresh) if c.get('datetime') == last['datetime']), None)
+            if overlap is not None and all(fresh[overlap].get(k) == last[k] for k in CANDLE_CACHE_FIELDS):
+                candles = cached[:-1] + fresh[overlap:]
+            else:
+                logger.info(f"{symbol}: cached candles no longer match price history; refetching")
+        
+        if candles is None:
+            candles = self._request_daily_candles(symbol, start)
+        
+        # The newest candle may still be forming, so it is never cached
+        self._candle_cache[symbol] = [{k: c[k] for k in CANDLE_CACHE_FIELDS} for c in candles[:-1]]
+        return candles
+    
+    @staticmethod
+    def _price_history_start() -> datetime:
+        """Start of the daily price-history window requested for each symbol"""
+        return datetime.now(timezone.utc).astimezone(ZoneInfo("America/New_York")) - timedelta(days=35)
+    
+    def get_market_data(self, symbol: str, start: Optional[datetime] = None) -> Optional[MarketData]:
+        """Get historical market data for a symbol (from start, default _price_history_start())"""
         try:
-            start = datetime.now(timezone.utc).astimezone(ZoneInfo("America/New_York")) - timedelta(days=35)
-            hist = self.client.get_price_history_every_day(symbol, start_datetime=start).json()
-            candles = hist.get('candles', [])
+            if start is None:
+                start = self._price_history_start()
+            candles = self._get_daily_candles(symbol, start)
             
             if not candles:
                 logger.warning(f"No market data found for {symbol}")
                 return None
             
             # Validate we have enough data for calculations
-            min_required = max(self.config.sma_period, self.config.ema_period,
-                             self.config.breakeven_ema_period,
-                             self.config.atr_period + 1, self.config.chandelier_period)
-            
+            min_required = self._min_candles
             if len(candles) < min_required:
                 logger.warning(f"Insufficient data for {symbol}. Need {min_required}, got {len(candles)}")
                 return None
             
-            return MarketData(
-                symbol=symbol,
-                highs=[c['high'] for c in candles],
-                lows=[c['low'] for c in candles],
-                closes=[c['close'] for c in candles]
-            )
+            # One pass over the candles fills all three series
+            highs, lows, closes = [], [], []
+            for c in candles:
+                highs.append(c['high'])
+                lows.append(c['low'])
+                closes.append(c['close'])
+            
+            return MarketData(symbol=symbol, highs=highs, lows=lows, closes=closes)
         except Exception as e:
             logger.error(f"Failed to get market data for {symbol}: {e}")
             return None
     
-    def get_position_quantity(self, symbol: str, positions: List[Dict]) -> float:
+    def _prefetch_market_data(self, symbols: List[str]) -> Dict[str, Optional[MarketData]]:
+        """Fetch market data for several symbols concurrently (one HTTPS call each)"""
+        if not symbols:
+            return {}
+        # One shared window start rather than a clock/timezone computation per symbol
+        fetch = functools.partial(self.get_market_data, start=self._price_history_start())
+        workers = min(self.config.market_data_workers, len(symbols))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return dict(zip(symbols, executor.map(fetch, symbols)))
+    
+    def get_position_quantity(self, symbol: str, positions_by_symbol: Dict[str, Dict]) -> float:
         """Get position quantity for a symbol"""
-        pos = next((p for p in positions if p['instrument']['assetType'] != "COLLECTIVE_INVESTMENT" 
-                    and p['instrument']['symbol'] == symbol), None)
+        # O(1) lookup in the index from _index_positions instead of scanning the position list
+        pos = positions_by_symbol.get(symbol)
         return (pos.get('longQuantity', 0) - pos.get('shortQuantity', 0)) if pos else 0
     
-    def get_position_info(self, symbol: str, positions: List[Dict]) -> Tuple[float, Optional[float]]:
+    @staticmethod
+    def _index_positions(positions: List[Dict]) -> Dict[str, Dict]:
+        """Map symbol -> first non-fund position, so per-ticker lookups are O(1)"""
+        index: Dict[str, Dict] = {}
+        for p in positions:
+            if p['instrument']['assetType'] == "COLLECTIVE_INVESTMENT":
+                continue
+            index.setdefault(p['instrument']['symbol'], p)
+        return index
+    
+    @staticmethod
+    def _index_sell_orders(open_orders: List[Dict]) -> Dict[str, Dict]:
+        """Map symbol -> first open order with a SELL leg for it, so per-ticker lookups are O(1)"""
+        index: Dict[str, Dict] = {}
+        for o in open_orders:
+            for leg in o['orderLegCollection']:
+                if leg['instruction'] == 'SELL':
+                    index.setdefault(leg['instrument']['symbol'], o)
+        return index
+    
+    def get_position_info(self, symbol: str, positions_by_symbol: Dict[str, Dict]) -> Tuple[float, Optional[float]]:
         """Get position quantity and average cost"""
-        pos = next((p for p in positions if p['instrument']['assetType'] != "COLLECTIVE_INVESTMENT" 
-                    and p['instrument']['symbol'] == symbol), None)
+        pos = positions_by_symbol.get(symbol)
         
         if not pos:
             return 0, None
@@ -293,18 +431,13 @@ class TradingManager:
         
         # Log position details for debugging
         if self.config.debug and quantity > 0:
-            logger.debug(f"{symbol}: Position quantity={quantity}, avg_cost={avg_cost}")
+            logger.debug("%s: Position quantity=%s, avg_cost=%s", symbol, quantity, avg_cost)
         
         return quantity, avg_cost
     
-    def find_existing_sell_order(self, symbol: str, open_orders: List[Dict]) -> Optional[Dict]:
+    def find_existing_sell_order(self, symbol: str, sell_orders_by_symbol: Dict[str, Dict]) -> Optional[Dict]:
         """Find existing sell order for a symbol"""
-        return next(
-            (o for o in open_orders
-             if any(leg['instrument']['symbol'] == symbol and leg['instruction'] == 'SELL'
-                    for leg in o['orderLegCollection'])),
-            None
-        )
+        return sell_orders_by_symbol.get(symbol)
     
     def calculate_exit_price(
         self,
@@ -319,14 +452,17 @@ class TradingManager:
         max(profit_floor, min(ema, chandelier)) with profit_floor from peak giveback.
         Returns profit_floor_price (or None) as the last tuple element for logging.
         """
+        cfg = self.config  # read once; the branches below consult several settings
+        # The strategy messages below are formatted only when DEBUG records are emitted
+        debug = logger.isEnabledFor(logging.DEBUG)
         try:
             # Calculate base indicators
             ema = TechnicalIndicators.exponential_moving_average(
-                market_data.closes, self.config.ema_period)
+                market_data.closes, cfg.ema_period)
             breakeven_ema = TechnicalIndicators.exponential_moving_average(
-                market_data.lows, self.config.breakeven_ema_period)
+                market_data.lows, cfg.breakeven_ema_period)
             chandelier = TechnicalIndicators.chandelier_exit(
-                market_data, self.config.chandelier_period, self.config.chandelier_multiplier)
+                market_data, cfg.chandelier_period, cfg.chandelier_multiplier)
             
             # Use latest close if current_price not provided
             if current_price is None:
@@ -337,54 +473,59 @@ class TradingManager:
             if avg_cost is not None:
                 unrealized_pnl_pct = (current_price - avg_cost) / avg_cost
                 
-                if unrealized_pnl_pct >= self.config.profit_threshold:
+                if unrealized_pnl_pct >= cfg.profit_threshold:
                     trail = min(ema, chandelier)
                     if (
                         peak_pnl_pct is not None
-                        and peak_pnl_pct + 1e-15 >= self.config.giveback_activation_pct
+                        and peak_pnl_pct + 1e-15 >= cfg.giveback_activation_pct
                     ):
                         profit_floor_price = avg_cost * (
-                            1 + peak_pnl_pct * (1 - self.config.giveback_pct)
+                            1 + peak_pnl_pct * (1 - cfg.giveback_pct)
                         )
                         exit_price = max(profit_floor_price, trail)
                         if profit_floor_price > trail + 1e-10:
                             strategy = "WINNER_TRAILING_GIVEBACK"
                         else:
                             strategy = "WINNER_TRAILING"
-                        logger.debug(
-                            f"{market_data.symbol}: Using {strategy}. P&L: {unrealized_pnl_pct:.1%}, "
-                            f"peak={peak_pnl_pct:.2%}, floor={profit_floor_price:.2f}, "
-                            f"trail=min({ema:.2f},{chandelier:.2f})={trail:.2f} -> stop={exit_price:.2f}"
-                        )
+                        if debug:
+                            logger.debug(
+                                f"{market_data.symbol}: Using {strategy}. P&L: {unrealized_pnl_pct:.1%}, "
+                                f"peak={peak_pnl_pct:.2%}, floor={profit_floor_price:.2f}, "
+                                f"trail=min({ema:.2f},{chandelier:.2f})={trail:.2f} -> stop={exit_price:.2f}"
+                            )
                     else:
                         exit_price = trail
                         strategy = "WINNER_TRAILING"
-                        logger.debug(
-                            f"{market_data.symbol}: Using WINNER_TRAILING strategy. "
-                            f"P&L: {unrealized_pnl_pct:.1%}, Stop: min({ema:.2f}, {chandelier:.2f}) = {exit_price:.2f}"
-                        )
+                        if debug:
+                            logger.debug(
+                                f"{market_data.symbol}: Using WINNER_TRAILING strategy. "
+                                f"P&L: {unrealized_pnl_pct:.1%}, Stop: min({ema:.2f}, {chandelier:.2f}) = {exit_price:.2f}"
+                            )
                     
-                elif unrealized_pnl_pct <= self.config.loss_threshold:
+                elif unrealized_pnl_pct <= cfg.loss_threshold:
                     # Losing trade - cut losses early with tight stop
-                    tight_stop = avg_cost * (1 - self.config.max_loss_percent)  # Max loss protection
+                    tight_stop = avg_cost * (1 - cfg.max_loss_percent)  # Max loss protection
                     conservative_stop = min(ema, chandelier)  # More aggressive of the two indicators
                     exit_price = max(conservative_stop, tight_stop)
                     strategy = "LOSS_CUTTING"
-                    logger.debug(f"{market_data.symbol}: Using LOSS_CUTTING strategy. "
-                               f"P&L: {unrealized_pnl_pct:.1%}, Stop: max({conservative_stop:.2f}, {tight_stop:.2f}) = {exit_price:.2f}")
+                    if debug:
+                        logger.debug(f"{market_data.symbol}: Using LOSS_CUTTING strategy. "
+                                   f"P&L: {unrealized_pnl_pct:.1%}, Stop: max({conservative_stop:.2f}, {tight_stop:.2f}) = {exit_price:.2f}")
                     
                 else:
                     # Break-even zone - use conservative approach with EMA of lows
                     exit_price = max(breakeven_ema, chandelier)
                     strategy = "BREAKEVEN_CONSERVATIVE"
-                    logger.debug(f"{market_data.symbol}: Using BREAKEVEN_CONSERVATIVE strategy. "
-                               f"P&L: {unrealized_pnl_pct:.1%}, Stop: max({breakeven_ema:.2f}, {chandelier:.2f}) = {exit_price:.2f}")
+                    if debug:
+                        logger.debug(f"{market_data.symbol}: Using BREAKEVEN_CONSERVATIVE strategy. "
+                                   f"P&L: {unrealized_pnl_pct:.1%}, Stop: max({breakeven_ema:.2f}, {chandelier:.2f}) = {exit_price:.2f}")
             else:
                 # Fallback to original logic if no cost basis available
                 exit_price = max(ema, chandelier)
                 strategy = "DEFAULT_CONSERVATIVE"
-                logger.debug(f"{market_data.symbol}: Using DEFAULT_CONSERVATIVE strategy (no cost basis). "
-                           f"Stop: max({ema:.2f}, {chandelier:.2f}) = {exit_price:.2f}")
+                if debug:
+                    logger.debug(f"{market_data.symbol}: Using DEFAULT_CONSERVATIVE strategy (no cost basis). "
+                               f"Stop: max({ema:.2f}, {chandelier:.2f}) = {exit_price:.2f}")
             
             return exit_price, ema, breakeven_ema, chandelier, strategy, profit_floor_price
             
@@ -438,24 +579,29 @@ class TradingManager:
             logger.error(f"Error {'replacing' if existing_order else 'placing'} order for {symbol}: {e}")
             return False
     
-    def process_symbol(self, symbol: str, positions: List[Dict], open_orders: List[Dict]) -> bool:
-        """Process trading logic for a single symbol"""
+    def process_symbol(self, symbol: str, positions_by_symbol: Dict[str, Dict],
+                       sell_orders_by_symbol: Dict[str, Dict],
+                       prefetched: Optional[Dict[str, Optional[MarketData]]] = None) -> bool:
+        """Process trading logic for a single symbol (using prefetched market data when present)"""
         logger.info(f"Processing symbol: {symbol}")
         
         # Get position info including cost basis
-        quantity, avg_cost = self.get_position_info(symbol, positions)
+        quantity, avg_cost = self.get_position_info(symbol, positions_by_symbol)
         if quantity <= 0:
             logger.info(f"{symbol}: no shares owned, skipping.")
             return True
         
         # Get market data
-        market_data = self.get_market_data(symbol)
+        if prefetched is not None and symbol in prefetched:
+            market_data = prefetched[symbol]
+        else:
+            market_data = self.get_market_data(symbol)
         if not market_data:
             logger.error(f"Could not get market data for {symbol}")
             return False
         
         # Find existing order
-        existing_order = self.find_existing_sell_order(symbol, open_orders)
+        existing_order = self.find_existing_sell_order(symbol, sell_orders_by_symbol)
         
         # Calculate adaptive exit price
         try:
@@ -506,19 +652,32 @@ class TradingManager:
         
         try:
             self._peak_state = self._load_peak_state()
+            self._candle_cache = self._load_candle_cache()
             # Get positions and orders
             positions = self.get_positions()
             open_orders = self.get_open_orders()
             
+            # Index once so each ticker is a dict lookup rather than a scan
+            positions_by_symbol = self._index_positions(positions)
+            sell_orders_by_symbol = self._index_sell_orders(open_orders)
+            
+            # Price history is only needed for tickers process_symbol won't skip as unowned,
+            # so filter with the same indexed quantity it checks and fetch those in parallel
+            owned = [symbol for symbol in dict.fromkeys(self.config.tickers)
+                     if self.get_position_quantity(symbol, positions_by_symbol) > 0]
+            prefetched = self._prefetch_market_data(owned)
+            
             success_count = 0
             for symbol in self.config.tickers:
-                if self.process_symbol(symbol, positions, open_orders):
+                if self.process_symbol(symbol, positions_by_symbol, sell_orders_by_symbol, prefetched):
                     success_count += 1
                 else:
                     logger.error(f"Failed to process {symbol}")
             
             self._prune_peak_state(self._peak_state, positions)
             self._save_peak_state(self._peak_state)
+            self._save_candle_cache({symbol: self._candle_cache[symbol]
+                                     for symbol in owned if symbol in self._candle_cache})
             
             logger.info(f"Successfully processed {success_count}/{len(self.config.tickers)} symbols")
             return success_count == len(self.config.tickers)
@@ -9,10 +9,15 @@ Target schema: ["orderId", "symbol", "instruction", "quantity", "price", "time"]
 """
 
 import csv
+import itertools
 import logging
+import os
+import re
+import tempfile
+from contextlib import ExitStack
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Dict, Iterator, List, Optional
 import hashlib
 
 # Setup logging
@@ -22,13 +27,43 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+OUTPUT_FIELDNAMES = ["orderId", "symbol", "instruction", "quantity", "price", "time"]
+_TIME_COLUMN = OUTPUT_FIELDNAMES.index("time")
+# Input columns every history file must have (Description is optional)
+REQUIRED_COLUMNS = ("Date", "Symbol", "Action", "Quantity", "Price")
+SAMPLE_ROWS = 3  # transformed rows echoed to the log after a successful run
+ISSUE_SAMPLES = 5  # example values kept per kind of malformed field for the summary
+
+# Empty MD5 state cloned per order ID; copying is cheaper than constructing a new hash object
+_MD5_BASE = hashlib.md5()
+
+# Read/write buffer for the history files; larger than the 8 KiB default to cut syscalls
+IO_BUFFER_SIZE = 1 << 20  # 1 MiB
+
 class HistoryTransformer:
     """Transform historical trades to Databricks format"""
     
-    def __init__(self, input_file: str = "history.csv", output_file: str = "historical_orders.csv"):
+    # Fixed attribute set: no per-instance __dict__, and slot reads in the per-row methods
+    __slots__ = ("input_file", "output_file", "max_rows", "since_date", "valid_actions",
+                 "exclude_keywords", "_exclude_pattern", "_date_cache", "_issue_counts",
+                 "_issue_samples")
+    
+    def __init__(self, input_file: str = "history.csv", output_file: str = "historical_orders.csv",
+                 max_rows: Optional[int] = None, since_date: Optional[str] = None):
         self.input_file = input_file
         self.output_file = output_file
         
+        # Optional limits: stop after max_rows trades are written; keep only trades on or
+        # after since_date (YYYY-MM-DD)
+        if max_rows is not None and max_rows <= 0:
+            raise ValueError("max_rows must be positive")
+        if since_date is not None:
+            # Normalised to zero-padded ISO (raises ValueError if malformed) so it compares
+            # correctly against the output time prefix, e.g. "2024-1-5" -> "2024-01-05"
+            since_date = datetime.strptime(since_date, "%Y-%m-%d").date().isoformat()
+        self.max_rows = max_rows
+        self.since_date = since_date
+        
         # Valid actions for stock trades
         self.valid_actions = {"Buy", "Sell"}
         
@@ -37,43 +72,68 @@ class HistoryTransformer:
             "dividend", "option", "call", "put", "reorganized", "tender", "warrant",
             "rights", "spin", "merger", "split", "distribution", "interest"
         }
+        # One case-insensitive pass over the description instead of a scan per keyword
+        self._exclude_pattern = re.compile(
+            "|".join(re.escape(keyword) for keyword in sorted(self.exclude_keywords)),
+            re.IGNORECASE,
+        )
+        
+        # History rows cluster on trade dates, so each distinct date string is parsed once
+        self._date_cache: Dict[str, str] = {}
+        
+        # Malformed-field counts and a few example values, logged once per transform()
+        self._issue_counts: Dict[str, int] = {}
+        self._issue_samples: Dict[str, List[str]] = {}
     
-    def is_valid_stock_trade(self, row: Dict[str, str]) -> bool:
-        """Check if row represents a valid stock Buy/Sell order"""
+    def _record_issue(self, issue: str, value: object) -> None:
+        """Count a malformed field, keeping the first few distinct values as examples"""
+        self._issue_counts[issue] = self._issue_counts.get(issue, 0) + 1
+        samples = self._issue_samples.setdefault(issue, [])
+        example = repr(value)
+        if len(samples) < ISSUE_SAMPLES and example not in samples:
+            samples.append(example)
+    
+    def _log_issue_summary(self) -> None:
+        """Emit one warning per kind of malformed field seen during the run"""
+        for issue, count in self._issue_counts.items():
+            logger.warning(f"{issue}: {count} rows (e.g. {', '.join(self._issue_samples[issue])})")
+    
+    def is_valid_stock_trade(self, action: str, symbol: str, quantity: str, price: str,
+                             description: str = "") -> bool:
+        """Check if the row's fields represent a valid stock Buy/Sell order"""
         
         # Must be Buy or Sell action
-        action = row.get("Action", "").strip()
+        action = action.strip()
         if action not in self.valid_actions:
             return False
         
         # Must have a symbol
-        symbol = row.get("Symbol", "").strip()
+        symbol = symbol.strip()
         if not symbol:
             return False
         
         # Must have quantity and price
-        quantity = row.get("Quantity", "").strip()
-        price = row.get("Price", "").strip()
-        if not quantity or not price:
+        if not quantity.strip() or not price.strip():
             return False
         
         # Check for options indicators in symbol (common patterns)
-        if any(char in symbol for char in ["C", "P"]) and len(symbol) > 6:
+        if len(symbol) > 6 and ("C" in symbol or "P" in symbol):
             # Likely an option symbol (e.g., AAPL240119C00150000)
             return False
         
         # Check description for excluded keywords
-        description = row.get("Description", "").lower()
-        if any(keyword in description for keyword in self.exclude_keywords):
+        if self._exclude_pattern.search(description):
             return False
         
         return True
     
-    def generate_order_id(self, row: Dict[str, str], row_index: int) -> str:
+    def generate_order_id(self, date: str, symbol: str, action: str, quantity: str, price: str,
+                          row_index: int) -> str:
         """Generate a unique order ID for historical data"""
-        # Create a hash from date + symbol + action + quantity + price + index
-        data_string = f"{row['Date']}{row['Symbol']}{row['Action']}{row['Quantity']}{row['Price']}{row_index}"
-        hash_object = hashlib.md5(data_string.encode())
+        # Create a hash from date + symbol + action + quantity + price + index (raw field values)
+        data_string = f"{date}{symbol}{action}{quantity}{price}{row_index}"
+        hash_object = _MD5_BASE.copy()
+        hash_object.update(data_string.encode())
         return f"HIST_{hash_object.hexdigest()[:12].upper()}"
     
     def clean_price(self, price_str: str) -> Optional[str]:
@@ -89,58 +149,120 @@ class HistoryTransformer:
             float(cleaned)
             return cleaned
         except ValueError:
-            logger.warning(f"Invalid price format: {price_str}")
+            self._record_issue("Invalid price format", price_str)
             return None
     
     def format_date(self, date_str: str) -> Optional[str]:
         """Convert date from MM/DD/YYYY to ISO format"""
+        formatted = self._date_cache.get(date_str)
+        if formatted is not None:
+            return formatted
+        
         try:
             # Parse date (assuming MM/DD/YYYY format)
             date_obj = datetime.strptime(date_str, "%m/%d/%Y")
             # Return in ISO format with timezone (matching order_export.py format)
-            return date_obj.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+            formatted = date_obj.strftime("%Y-%m-%dT%H:%M:%S.000Z")
         except ValueError:
-            logger.warning(f"Invalid date format: {date_str}")
+            self._record_issue("Invalid date format", date_str)
             return None
+        
+        self._date_cache[date_str] = formatted
+        return formatted
     
     def clean_quantity(self, quantity_str: str) -> Optional[str]:
         """Clean quantity string and ensure it's positive"""
         if not quantity_str:
             return None
         
+        # Whole-share quantities ("100", "-5") skip the float round-trip; int() also
+        # normalises leading zeros the way the float path does
+        stripped = quantity_str.strip()
+        digits = stripped[1:] if stripped.startswith("-") else stripped
+        if digits.isascii() and digits.isdigit():
+            return str(int(digits))
+        
         try:
-            # Remove any whitespace and convert to float to validate
-            quantity = float(quantity_str.strip())
+            # Convert to float to validate (fractional or exponent forms)
+            quantity = float(stripped)
             # Return absolute value as string (some sells might have negative quantities)
             return str(abs(int(quantity)))
         except ValueError:
-            logger.warning(f"Invalid quantity format: {quantity_str}")
+            self._record_issue("Invalid quantity format", quantity_str)
             return None
     
-    def transform_row(self, row: Dict[str, str], row_index: int) -> Optional[Dict[str, str]]:
-        """Transform a single row to target format"""
+    def transform_row(self, date: str, symbol: str, action: str, quantity: str, price: str,
+                      row_index: int) -> Optional[List[str]]:
+        """Transform a single row's fields to a target-format row (OUTPUT_FIELDNAMES order)"""
         
         # Clean and validate all fields
-        order_id = self.generate_order_id(row, row_index)
-        symbol = row.get("Symbol", "").strip()
-        instruction = row.get("Action", "").strip()  # Buy or Sell
-        quantity = self.clean_quantity(row.get("Quantity", ""))
-        price = self.clean_price(row.get("Price", ""))
-        time = self.format_date(row.get("Date", ""))
+        order_id = self.generate_order_id(date, symbol, action, quantity, price, row_index)
+        clean_symbol = symbol.strip()
+        instruction = action.strip()  # Buy or Sell
+        clean_quantity = self.clean_quantity(quantity)
+        clean_price = self.clean_price(price)
+        time = self.format_date(date)
+        
+        transformed = [order_id, clean_symbol, instruction, clean_quantity, clean_price, time]
         
         # Validate all required fields are present
-        if not all([order_id, symbol, instruction, quantity, price, time]):
-            logger.warning(f"Skipping row due to missing data: {row}")
+        if not all(transformed):
+            self._record_issue("Rows skipped for missing data (row numbers)", row_index)
             return None
         
-        return {
-            "orderId": order_id,
-            "symbol": symbol,
-            "instruction": instruction,
-            "quantity": quantity,
-            "price": price,
-            "time": time
-        }
+        return transformed
+    
+    def _transformed_rows(self, reader: Iterator[List[str]], header: List[str],
+                          counts: Dict[str, int]) -> Iterator[List[str]]:
+        """Yield target-format rows for the valid stock trades read from reader
+        
+        counts["rows"], ["trades"] and ["older"] are updated as rows are consumed.
+        Stops after max_rows trades; counts["truncated"] is set if a further trade
+        was left unread.
+        """
+        # Plain list rows addressed by header position (no dict per row); as with
+        # csv.DictReader, a repeated header name resolves to its last column
+        columns = {name: i for i, name in enumerate(header)}
+        i_date, i_symbol, i_action, i_quantity, i_price = (columns[name] for name in REQUIRED_COLUMNS)
+        i_description = columns.get("Description")
+        width = len(header)
+        
+        # The per-row calls are bound once rather than looked up on every iteration
+        is_valid_stock_trade = self.is_valid_stock_trade
+        transform_row = self.transform_row
+        since_date = self.since_date
+        max_rows = self.max_rows
+        
+        # Blank lines are skipped without being counted, as csv.DictReader does,
+        # so row_index (part of each order ID) is unchanged
+        for row_index, row in enumerate((row for row in reader if row), 1):
+            counts["rows"] += 1
+            if len(row) < width:
+                row += [""] * (width - len(row))
+            
+            # Check if this is a valid stock trade
+            description = row[i_description] if i_description is not None else ""
+            if not is_valid_stock_trade(row[i_action], row[i_symbol], row[i_quantity],
+                                        row[i_price], description):
+                continue
+            
+            # Transform the row
+            transformed_row = transform_row(row[i_date], row[i_symbol], row[i_action],
+                                            row[i_quantity], row[i_price], row_index)
+            if not transformed_row:
+                continue
+            
+            # Output times are ISO strings, so the date prefix compares lexically
+            if since_date is not None and transformed_row[_TIME_COLUMN][:10] < since_date:
+                counts["older"] += 1
+                continue
+            
+            if max_rows is not None and counts["trades"] >= max_rows:
+                counts["truncated"] = 1
+                return
+            
+            counts["trades"] += 1
+            yield transformed_row
     
     def transform(self) -> bool:
         """Main transformation process"""
@@ -151,36 +273,55 @@ class HistoryTransformer:
             logger.error(f"Input file not found: {self.input_file}")
             return False
         
+        self._issue_counts.clear()
+        self._issue_samples.clear()
+        
+        tmp_path = None
         try:
-            transformed_rows = []
-            total_rows = 0
-            valid_trades = 0
+            counts = {"rows": 0, "trades": 0, "older": 0, "truncated": 0}
             
-            # Read and process input file
-            with open(self.input_file, 'r', newline='', encoding='utf-8') as infile:
-                reader = csv.DictReader(infile)
+            # Transformed rows stream from the reader straight into csv writerows. They
+            # go to a temporary file beside the output, which replaces it only once the
+            # whole input has been read, so a failed run leaves any earlier output in
+            # place. The file is only created once a first valid trade turns up, so no
+            # trades still means no file
+            with ExitStack() as stack:
+                infile = stack.enter_context(open(self.input_file, 'r', newline='', encoding='utf-8',
+                                                  buffering=IO_BUFFER_SIZE))
+                reader = csv.reader(infile)
+                header = next(reader, [])
+                missing = [name for name in REQUIRED_COLUMNS if name not in header]
+                if missing:
+                    logger.error(f"Input file is missing required columns: {', '.join(missing)}")
+                    return False
                 
-                for row_index, row in enumerate(reader, 1):
-                    total_rows += 1
-                    
-                    # Check if this is a valid stock trade
-                    if not self.is_valid_stock_trade(row):
-                        continue
-                    
-                    # Transform the row
-                    transformed_row = self.transform_row(row, row_index)
-                    if transformed_row:
-                        transformed_rows.append(transformed_row)
-                        valid_trades += 1
+                rows = self._transformed_rows(reader, header, counts)
+                sample_rows = list(itertools.islice(rows, SAMPLE_ROWS))
+                if sample_rows:
+                    output_path = Path(self.output_file)
+                    fd, tmp_path = tempfile.mkstemp(
+                        dir=str(output_path.parent), prefix=f".{output_path.name}.", suffix=".tmp"
+                    )
+                    outfile = stack.enter_context(os.fdopen(fd, 'w', newline='', encoding='utf-8',
+                                                            buffering=IO_BUFFER_SIZE))
+                    writer = csv.writer(outfile)
+                    writer.writerow(OUTPUT_FIELDNAMES)
+                    writer.writerows(sample_rows)
+                    writer.writerows(rows)
             
-            # Write output file
-            if transformed_rows:
-                with open(self.output_file, 'w', newline='', encoding='utf-8') as outfile:
-                    fieldnames = ["orderId", "symbol", "instruction", "quantity", "price", "time"]
-                    writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-                    writer.writeheader()
-                    writer.writerows(transformed_rows)
-                
+            if tmp_path is not None:
+                os.replace(tmp_path, self.output_file)
+                tmp_path = None
+            
+            total_rows = counts["rows"]
+            valid_trades = counts["trades"]
+            
+            self._log_issue_summary()
+            if self.since_date is not None:
+                logger.info(f"Trades before {self.since_date} skipped: {counts['older']}")
+            if counts["truncated"]:
+                logger.info(f"Reached max_rows={self.max_rows}; stopped early")
+            if valid_trades:
                 logger.info(f"✅ Transformation completed successfully!")
                 logger.info(f"📊 Total rows processed: {total_rows}")
                 logger.info(f"📈 Valid stock trades found: {valid_trades}")
@@ -188,8 +329,8 @@ class HistoryTransformer:
                 
                 # Show sample of first few records
                 logger.info("📋 Sample of transformed data:")
-                for i, row in enumerate(transformed_rows[:3]):
-                    logger.info(f"   {i+1}. {row['instruction']} {row['quantity']} {row['symbol']} @ ${row['price']} on {row['time'][:10]}")
+                for i, (_, symbol, instruction, quantity, price, time) in enumerate(sample_rows):
+                    logger.info(f"   {i+1}. {instruction} {quantity} {symbol} @ ${price} on {time[:10]}")
                 
                 return True
             else:
@@ -199,6 +340,12 @@ class HistoryTransformer:
         except Exception as e:
             logger.error(f"Error during transformation: {e}")
             return False
+        finally:
+            if tmp_path is not None:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
 
 def main():
     """Main entry point"""